@@ -1,292 +1,559 @@
-#####################################################################
-#                                                                   #
-# /labscript_devices/ThorCam/blacs_workers.py             #
-#                                                                   #
-# Copyright 2019, Monash University and contributors                #
-#                                                                   #
-# This file is part of labscript_devices, in the labscript suite    #
-# (see http://labscriptsuite.org), and is licensed under the        #
-# Simplified BSD License. See the license.txt file in the root of   #
-# the project for the full license.                                 #
-#                                                                   #
-#####################################################################
-
-# Original imaqdx_camera server by dt, with modifications by rpanderson and cbillington.
-# Refactored as a BLACS worker by cbillington
-# Original PyCapture2_camera_server by dsbarker
-# Ported to BLACS worker by dihm
-
-import numpy as np
-from labscript_utils import dedent
-from enum import IntEnum
-import os
-
-from labscript_devices.IMAQdxCamera.blacs_workers import IMAQdxCameraWorker
-
-# Don't import API yet so as not to throw an error, allow worker to run as a dummy
-# device, or for subclasses to import this module to inherit classes without requiring API
-TLCameraSDK = None
-absolute_path_to_dlls = ""
-
-operation_mode_dict = {'SOFTWARE_TRIGGERED':0,'HARDWARE_TRIGGERED':1,'BULB':2}
-
-class Thorlab_Camera(object):
-    
-    def __init__(self, serial_number):
-       
-        os.environ['PATH']=r'C:\Windows\System32'+os.pathsep+os.environ['PATH']
-        # Python 3.8 introduces a new method to specify dll directory
-        os.add_dll_directory(r'C:\Windows\System32')
-
-        global TLCameraSDK
-        from labscript_devices.ThorCam.source.tl_camera import TLCameraSDK
-        
-        self.thorsdk = TLCameraSDK()
-        available_cameras = self.thorsdk.discover_available_cameras()
-        if len(available_cameras) < 1:
-            raise ValueError("no cameras detected")
-        print('Connecting to SN:%d ...'%serial_number)
-
-        self.camera = self.thorsdk.open_camera(str(serial_number))
-        
-        # set which values of properties to return
-        self.props = {}
-        
-        if self.camera.is_armed:
-            self.camera.disarm()
-            self.is_armed=False
-
-        self._abort_acquisition = False
-        self.exception_on_failed_shot = True
-        self.software=True
-        self.is_armed=False
-
-    def get_attributes(self):
-        self.props['OperationMode'] = self.camera.operation_mode
-        self.props['Gain'] = self.camera.gain
-        self.props['ExposureTime'] = self.camera.exposure_time_us
-        self.props['BLackLevel'] = self.camera.black_level
-        self.props['Width'] = self.camera.image_width_pixels
-        self.props['Height'] = self.camera.image_height_pixels
-        return self.props
-
-    def set_attributes(self, attr_dict):
-        """Sets all attribues in attr_dict.
-        
-        FlyCapture does not control all settings through same interface,
-        so we must do them separately.
-        Interfaces are: <Standard PROPERTY_TYPE>, TriggerMode, ImageMode
-            
-        Args:
-            attr_dict (dict): dictionary of property dictionaries to set for the camera.
-                These property dictionaries assume a specific structure, outlined in
-                :obj:`set_attribute`, :obj:`set_trigger_mode` and , :obj:`set_image_mode`
-                methods.
-        """
-        if self.camera.is_armed:
-            self.camera.disarm()
-            self.is_armed=False
-        for prop, vals in attr_dict.items():
-                
-            if prop == 'OperationMode':
-                self.set_operation_mode(vals)
-                self.trigger_mode = vals
-            elif prop == 'Gain':
-                self.set_gain(vals)
-            elif prop == 'ExposureTime':
-                self.set_exposure(vals)
-            elif prop == 'BLackLevel':
-                self.set_blackLevel(vals)
-            
-    def set_operation_mode(self,operationMode):
-        """Configures ROI and image control via Format 7, Mode 0 interface.
-        
-        Args:
-            image_settings (dict): dictionary of image settings. Allowed keys:
-                
-                * 'pixelFormat': valid pixel format string, i.e. 'MONO8'
-                * 'offsetX': int
-                * 'offsetY': int
-                * 'width': int
-                * 'height': int
-        """
-        self.camera.operation_mode=operation_mode_dict[operationMode]
-
-    def set_gain(self, gain):
-        if gain > 48 or gain < 0:
-            raise ValueError("Gain must be between 0 and 48")
-        else:
-            self.camera.gain=gain
-
-    def set_exposure(self,exposureTime):
-        self.camera.exposure_time_us=exposureTime
-    
-    def set_blackLevel(self, blackLevel):
-        blackLevel = int(blackLevel)
-        if blackLevel > 511 or blackLevel < 0:
-            raise ValueError("Gain must be between 0 and 48")
-        else:
-            self.camera.black_level=blackLevel  
-
-
-    # def set_attribute(self, name, values):
-    #     """Set the values of the attribute of the given name using the provided
-    #     dictionary values. 
-        
-    #     Generally, absControl should be used to configure settings. Note that
-    #     invalid settings tend to coerce instead of presenting an error.
-        
-    #     Args:
-    #         name (str): 
-    #         values (dict): Dictionary of settings for the property. Allowed keys are:
-                
-    #             * 'onOff': bool
-    #             * 'autoManualMode': bool
-    #             * 'absControl': bool
-    #             * 'absValue': float
-    #             * 'valueA': int
-    #             * 'valueB': int
-    #             * 'onePush': bool
-    #     """
-    #     try:
-    #         prop = self.camera.getProperty(getattr(PyCapture2.PROPERTY_TYPE,name))
-            
-    #         for key, val in values.items():
-    #             setattr(prop,key,val)
-    #         self.camera.setProperty(prop)
-    #     except Exception as e:
-    #         # Add some info to the exception:
-    #         msg = f"failed to set attribute {name} to {values}"
-    #         raise Exception(msg) from e
-        
-
-    def snap(self):
-        """Acquire a single image and return it
-        
-        Returns:
-            numpy.array: Acquired image
-        """
-        if self.camera.is_armed:
-            self.camera.disarm()
-            self.is_armed=False
-        self.set_operation_mode('SOFTWARE_TRIGGERED')
-        self.configure_acquisition(continuous=False,bufferCount=1)
-        self.software = True
-        image = self.grab()
-        self.stop_acquisition()
-        return image
-
-    def configure_acquisition(self, continuous=True, bufferCount=2):
-        """Configure acquisition buffer count and grab mode.
-        
-        This method also saves image width, heigh, and pixelFormat to class
-        attributes for returned image formatting.
-        
-        Args:
-            continuous (:obj:`bool`, optional): If True, camera will continuously
-                acquire and only keep most recent frames in the buffer. If False,
-                all acquired frames are kept and error occurs if buffer is exceeded.
-                Default is True.
-            bufferCount (:obj:`int`, optional): Number of memory buffers to use 
-                in the acquistion. Default is 10.
-        """
-        print('nframe'+str(self.camera.frames_per_trigger_zero_for_unlimited))
-        if continuous:
-            self.camera.frames_per_trigger_zero_for_unlimited = 0
-        else:
-            self.camera.frames_per_trigger_zero_for_unlimited = 1
-            
-
-            
-    def grab(self):
-        """Grab and return single image during pre-configured acquisition.
-        
-        Returns:
-            numpy.array: Returns formatted image
-        """
-        if not self.is_armed:
-            self.camera.arm(50) # Buffer size on the camera in number of images; buffer size should be no smaller than the number of images in a single shot
-            self.is_armed = True
-        if self.software:
-            self.camera.issue_software_trigger()
-        img =None
-        while not img:
-            img = self.camera.get_pending_frame_or_null()
-
-        #result.ReleaseBuffer(), exists in documentation, not PyCapture2
-        return img.image_buffer
-
-    def grab_multiple(self, n_images, images):
-        """Grab n_images into images array during buffered acquistion.
-        
-        Grab method involves a continuous loop with fast timeout in order to
-        poll :obj:`_abort_acquisition` for a signal to abort.
-        
-        Args:
-            n_images (int): Number of images to acquire. Should be same number
-                as the bufferCount in :obj:`configure_acquisition`.
-            images (list): List that images will be saved to as they are acquired
-        """
-        img = 1
-        while img:
-            img = self.camera.get_pending_frame_or_null()
-        self.software = False
-        if self.camera.is_armed:
-            self.camera.disarm()
-            self.is_armed=False
-        self.set_operation_mode(self.trigger_mode)
-        self.camera.arm(50) # Buffer size on the camera in number of images; buffer size should be no smaller than the number of images in a single shot
-        self.is_armed = True
-        print(f"Attempting to grab {n_images} images.")
-        for i in range(n_images):
-            while True:
-                if self._abort_acquisition:
-                    print("Abort during acquisition.")
-                    self._abort_acquisition = False
-                    return
-                try:
-                    images.append(self.grab())
-                    print(f"Got image {i+1} of {n_images}.")
-                    break
-                except:
-                    print('.', end='')
-                    continue
-        print(f"Got {len(images)} of {n_images} images.")
-        self.software = True
-
-    def stop_acquisition(self):
-        """Tells camera to stop current acquistion."""
-        self.camera.disarm()
-        self.is_armed=False
-
-    def abort_acquisition(self):
-        """Sets :obj:`_abort_acquisition` flag to break buffered acquisition loop."""
-        self._abort_acquisition = True
-
-    def close(self):
-        """Closes :obj:`camera` handle to the camera."""
-        self.camera.dispose()
-        self.thorsdk.dispose()
-
-
-class ThorCamWorker(IMAQdxCameraWorker):
-    """FlyCapture2 API Camera Worker. 
-    
-    Inherits from obj:`IMAQdxCameraWorker`. Defines :obj:`interface_class` and overloads
-    :obj:`get_attributes_as_dict` to use ThorCam.get_attributes() method."""
-    interface_class = Thorlab_Camera
-
-    def get_attributes_as_dict(self, visibility_level):
-        """Return a dict of the attributes of the camera for the given visibility
-        level
-        
-        Args:
-            visibility_level (str): Normally configures level of attribute detail
-                to return. Is not used by Thorlab_Camera.
-        """
-        if self.mock:
-            return IMAQdxCameraWorker.get_attributes_as_dict(self,visibility_level)
-        else:
-            return self.camera.get_attributes()
-
-
+#####################################################################
+#                                                                   #
+# /labscript_devices/ThorCam/blacs_workers.py             #
+#                                                                   #
+# Copyright 2019, Monash University and contributors                #
+#                                                                   #
+# This file is part of labscript_devices, in the labscript suite    #
+# (see http://labscriptsuite.org), and is licensed under the        #
+# Simplified BSD License. See the license.txt file in the root of   #
+# the project for the full license.                                 #
+#                                                                   #
+#####################################################################
+
+# Original imaqdx_camera server by dt, with modifications by rpanderson and cbillington.
+# Refactored as a BLACS worker by cbillington
+# Original PyCapture2_camera_server by dsbarker
+# Ported to BLACS worker by dihm
+
+import numpy as np
+from labscript_utils import dedent
+from enum import IntEnum
+import logging
+import os
+import queue
+import threading
+import time
+
+from labscript_devices.IMAQdxCamera.blacs_workers import IMAQdxCameraWorker
+
+logger = logging.getLogger(__name__)
+
+# Set up the DLL search path and import the SDK once per process rather than
+# on every camera construction. Failure is tolerated so the worker can run as
+# a dummy device, or so subclasses can import this module without the API.
+absolute_path_to_dlls = ""
+try:
+    os.environ['PATH'] = r'C:\Windows\System32' + os.pathsep + os.environ['PATH']
+    # Python 3.8 introduces a new method to specify dll directory
+    os.add_dll_directory(r'C:\Windows\System32')
+    from labscript_devices.ThorCam.source.tl_camera import TLCameraSDK
+except (OSError, ImportError, AttributeError):
+    TLCameraSDK = None
+
+# discover_available_cameras() result, cached briefly since every camera
+# construction repeats the same (slow) USB enumeration.
+_available_cameras = None
+_available_cameras_timestamp = 0
+_DISCOVERY_CACHE_SECONDS = 1
+
+
+def _discover_available_cameras(sdk):
+    """Return sdk.discover_available_cameras(), cached for a short interval."""
+    global _available_cameras, _available_cameras_timestamp
+    now = time.monotonic()
+    if (
+        _available_cameras is None
+        or now - _available_cameras_timestamp > _DISCOVERY_CACHE_SECONDS
+    ):
+        _available_cameras = sdk.discover_available_cameras()
+        _available_cameras_timestamp = now
+    return _available_cameras
+
+class OperationMode(IntEnum):
+    """Camera trigger modes, with values matching the TSI SDK's OPERATION_MODE."""
+    SOFTWARE_TRIGGERED = 0
+    HARDWARE_TRIGGERED = 1
+    BULB = 2
+
+class FrameTimeout(Exception):
+    """Raised when the camera does not deliver a frame within the expected time."""
+
+
+class Thorlab_Camera(object):
+
+    # Consecutive frame timeouts tolerated in grab_multiple before the shot
+    # is considered failed.
+    MAX_GRAB_FAILURES = 3
+
+    # Valid (inclusive) setting ranges for the camera.
+    GAIN_RANGE = (0, 48)
+    BLACK_LEVEL_RANGE = (0, 511)
+
+    def __init__(self, serial_number):
+
+        if TLCameraSDK is None:
+            raise ImportError(
+                "Thorlabs TSI SDK could not be loaded. "
+                "Check that the ThorCam DLLs are installed."
+            )
+
+        self.thorsdk = TLCameraSDK()
+        available_cameras = _discover_available_cameras(self.thorsdk)
+        if len(available_cameras) < 1:
+            raise ValueError("no cameras detected")
+        logger.info('Connecting to SN:%d ...', serial_number)
+
+        self.camera = self.thorsdk.open_camera(str(serial_number))
+        
+        # set which values of properties to return
+        self.props = {}
+        
+        if self.camera.is_armed:
+            self.camera.disarm()
+            self.is_armed=False
+
+        self._abort_event = threading.Event()
+        self.exception_on_failed_shot = True
+        self.software=True
+        self.is_armed=False
+        self._buffer_count = 2
+
+        # Dispatch table for set_attributes, built once rather than string
+        # comparisons on every write.
+        self._setters = {
+            'OperationMode': self._set_operation_mode_attribute,
+            'Gain': self.set_gain,
+            'ExposureTime': self.set_exposure,
+            'BLackLevel': self.set_blackLevel,
+        }
+
+    def get_attributes(self):
+        """Return the camera attributes as a dict.
+
+        Values set through this class are cached by the setters, so only
+        attributes not yet known are queried from the camera; each query is
+        a separate USB round-trip.
+        """
+        reads = {
+            'OperationMode': lambda: self.camera.operation_mode,
+            'Gain': lambda: self.camera.gain,
+            'ExposureTime': lambda: self.camera.exposure_time_us,
+            'BLackLevel': lambda: self.camera.black_level,
+            # Width and height are fixed for the life of the connection.
+            'Width': lambda: self.camera.image_width_pixels,
+            'Height': lambda: self.camera.image_height_pixels,
+        }
+        for name, read in reads.items():
+            if name not in self.props:
+                self.props[name] = read()
+        return self.props
+
+    def set_attributes(self, attr_dict):
+        """Sets all attribues in attr_dict.
+        
+        FlyCapture does not control all settings through same interface,
+        so we must do them separately.
+        Interfaces are: <Standard PROPERTY_TYPE>, TriggerMode, ImageMode
+            
+        Args:
+            attr_dict (dict): dictionary of property dictionaries to set for the camera.
+                These property dictionaries assume a specific structure, outlined in
+                :obj:`set_attribute`, :obj:`set_trigger_mode` and , :obj:`set_image_mode`
+                methods.
+        """
+        # Apply all writes inside a single disarm/rearm cycle: disarm only if
+        # the camera is actually armed, and restore the armed state once at
+        # the end rather than cycling it per attribute.
+        was_armed = self.camera.is_armed
+        if was_armed:
+            self.camera.disarm()
+            self.is_armed=False
+        for prop, vals in attr_dict.items():
+            self._setters[prop](vals)
+        if was_armed:
+            self._arm(self._buffer_count)
+            
+    def set_operation_mode(self,operationMode):
+        """Configures ROI and image control via Format 7, Mode 0 interface.
+        
+        Args:
+            image_settings (dict): dictionary of image settings. Allowed keys:
+                
+                * 'pixelFormat': valid pixel format string, i.e. 'MONO8'
+                * 'offsetX': int
+                * 'offsetY': int
+                * 'width': int
+                * 'height': int
+        """
+        self.camera.operation_mode = OperationMode[operationMode].value
+        self.props['OperationMode'] = OperationMode[operationMode].value
+
+    def _set_operation_mode_attribute(self, operationMode):
+        """Set the operation mode and record it as the shot trigger mode.
+
+        Used by :obj:`set_attributes` so that snap(), which temporarily
+        switches to software triggering, does not clobber the configured
+        trigger mode for buffered shots.
+        """
+        self.set_operation_mode(operationMode)
+        self.trigger_mode = operationMode
+
+    def set_gain(self, gain):
+        lo, hi = self.GAIN_RANGE
+        if not lo <= gain <= hi:
+            raise ValueError(f"Gain must be between {lo} and {hi}")
+        self.camera.gain = gain
+        self.props['Gain'] = gain
+
+    def set_exposure(self,exposureTime):
+        self.camera.exposure_time_us=exposureTime
+        self.props['ExposureTime'] = exposureTime
+
+    def set_blackLevel(self, blackLevel):
+        # UI sliders may hand over floats; the camera wants an int.
+        blackLevel = int(blackLevel)
+        lo, hi = self.BLACK_LEVEL_RANGE
+        if not lo <= blackLevel <= hi:
+            raise ValueError(f"BlackLevel must be between {lo} and {hi}")
+        self.camera.black_level = blackLevel
+        self.props['BLackLevel'] = blackLevel
+
+
+    # def set_attribute(self, name, values):
+    #     """Set the values of the attribute of the given name using the provided
+    #     dictionary values. 
+        
+    #     Generally, absControl should be used to configure settings. Note that
+    #     invalid settings tend to coerce instead of presenting an error.
+        
+    #     Args:
+    #         name (str): 
+    #         values (dict): Dictionary of settings for the property. Allowed keys are:
+                
+    #             * 'onOff': bool
+    #             * 'autoManualMode': bool
+    #             * 'absControl': bool
+    #             * 'absValue': float
+    #             * 'valueA': int
+    #             * 'valueB': int
+    #             * 'onePush': bool
+    #     """
+    #     try:
+    #         prop = self.camera.getProperty(getattr(PyCapture2.PROPERTY_TYPE,name))
+            
+    #         for key, val in values.items():
+    #             setattr(prop,key,val)
+    #         self.camera.setProperty(prop)
+    #     except Exception as e:
+    #         # Add some info to the exception:
+    #         msg = f"failed to set attribute {name} to {values}"
+    #         raise Exception(msg) from e
+        
+
+    def snap(self):
+        """Acquire a single image and return it
+        
+        Returns:
+            numpy.array: Acquired image
+        """
+        if self.camera.is_armed:
+            self.camera.disarm()
+            self.is_armed=False
+        self.set_operation_mode('SOFTWARE_TRIGGERED')
+        self.configure_acquisition(continuous=False,bufferCount=1)
+        self.software = True
+        # grab() returns a view into the SDK's frame buffer, which is
+        # invalidated by disarm; copy once before stopping the acquisition.
+        image = np.copy(self.grab())
+        self.stop_acquisition()
+        return image
+
+    def configure_acquisition(self, continuous=True, bufferCount=2):
+        """Configure acquisition buffer count and grab mode.
+        
+        This method also saves image width, heigh, and pixelFormat to class
+        attributes for returned image formatting.
+        
+        Args:
+            continuous (:obj:`bool`, optional): If True, camera will continuously
+                acquire and only keep most recent frames in the buffer. If False,
+                all acquired frames are kept and error occurs if buffer is exceeded.
+                Default is True.
+            bufferCount (:obj:`int`, optional): Number of frames the SDK
+                buffers on the camera. Use 1 for software-triggered snaps
+                where only the latest frame matters; larger counts only add
+                memory footprint and stale-frame latency. Default is 2.
+        """
+        logger.debug(
+            'nframe %d', self.camera.frames_per_trigger_zero_for_unlimited
+        )
+        self._buffer_count = bufferCount
+        if continuous:
+            self.camera.frames_per_trigger_zero_for_unlimited = 0
+        else:
+            self.camera.frames_per_trigger_zero_for_unlimited = 1
+            
+
+            
+    def _arm(self, buffer_count):
+        """Arm the camera with the given number of frame buffers.
+
+        Also sets the SDK poll timeout so frame waits block inside the DLL
+        (which releases the GIL) for up to one exposure plus readout margin,
+        and records the overall per-frame deadline after which :obj:`grab`
+        raises :obj:`FrameTimeout`.
+        """
+        exposure_s = self.camera.exposure_time_us / 1e6
+        self.camera.image_poll_timeout_ms = int(exposure_s * 1000) + 500
+        self._frame_timeout = 3 * exposure_s + 1.0
+        self._fast_grab = self._make_fast_grab()
+        self.camera.arm(buffer_count)
+        self.is_armed = True
+
+    def _make_fast_grab(self):
+        """Return a frame-wait function specialized for the current config.
+
+        The poll method, frame deadline and clock are bound into the
+        closure, so the per-frame hot loop performs no attribute lookups.
+        Rebuilt by :obj:`_arm` whenever the exposure-derived deadline may
+        have changed.
+        """
+        poll = self.camera.get_pending_frame_or_null
+        frame_timeout = self._frame_timeout
+        monotonic = time.monotonic
+
+        def fast_grab():
+            deadline = monotonic() + frame_timeout
+            img = poll()
+            while img is None:
+                # Each poll blocks for image_poll_timeout_ms in C, so this
+                # loop is not a busy-wait.
+                if monotonic() > deadline:
+                    raise FrameTimeout(
+                        f"No frame received within {frame_timeout:.1f} s"
+                    )
+                img = poll()
+            return img.image_buffer
+
+        return fast_grab
+
+    def _drain_to_latest(self):
+        """Discard frames queued in the SDK ring buffer, keeping the newest.
+
+        When the processing loop falls behind, the SDK buffers frames and
+        subsequent polls return stale images. This pulls all pending frames
+        in a non-blocking loop and returns only the most recent (or None if
+        the buffer was empty), logging how many were discarded.
+
+        Returns:
+            Frame: Newest pending frame, or None if no frames were queued.
+        """
+        latest = None
+        dropped = -1
+        saved_timeout = self.camera.image_poll_timeout_ms
+        self.camera.image_poll_timeout_ms = 0
+        while True:
+            frame = self.camera.get_pending_frame_or_null()
+            if frame is None:
+                break
+            latest = frame
+            dropped += 1
+        self.camera.image_poll_timeout_ms = saved_timeout
+        if dropped > 0:
+            logger.debug('Discarded %d stale frames', dropped)
+        return latest
+
+    def grab(self):
+        """Grab and return single image during pre-configured acquisition.
+
+        Returns:
+            numpy.array: Zero-copy view into the SDK's frame buffer. The view
+            is only valid until the next call to get_pending_frame_or_null()
+            or until the camera is disarmed; callers keeping the image longer
+            must np.copy() it.
+        """
+        if not self.is_armed:
+            self._arm(self._buffer_count)
+        if self.software:
+            # Flush anything buffered before this trigger so the frame
+            # returned reflects the current scene, not a stale one.
+            self._drain_to_latest()
+            self.camera.issue_software_trigger()
+        return self._wait_for_frame()
+
+    def _wait_for_frame(self):
+        """Block until the next frame is available and return its buffer view.
+
+        Raises:
+            FrameTimeout: If no frame arrives within the per-frame deadline
+                recorded by :obj:`_arm`.
+        """
+        return self._fast_grab()
+
+    def grab_multiple(self, n_images, images):
+        """Grab n_images into images array during buffered acquistion.
+        
+        Grab method involves a continuous loop with fast timeout in order to
+        poll :obj:`_abort_acquisition` for a signal to abort.
+        
+        Args:
+            n_images (int): Number of images to acquire. Should be same number
+                as the bufferCount in :obj:`configure_acquisition`.
+            images (list or numpy.ndarray): Container images are saved to as
+                they are acquired. A preallocated (n_images, H, W) array is
+                filled in place with a single memcpy per frame; a list gets
+                a freshly allocated copy appended per frame.
+        """
+        # Software-triggered shots are triggered from this loop; hardware
+        # triggered shots are driven by the external trigger source.
+        self.software = self.trigger_mode == 'SOFTWARE_TRIGGERED'
+        if self.camera.is_armed:
+            # Disarming flushes the driver's frame queue in a single SDK
+            # call, so no frame-by-frame drain is needed here.
+            self.camera.disarm()
+            self.is_armed=False
+        self.set_operation_mode(self.trigger_mode)
+        # Buffer size on the camera in number of images; buffer size should be
+        # no smaller than the number of images in a single shot
+        self._buffer_count = n_images
+        self._arm(n_images)
+        logger.info('Attempting to grab %d images.', n_images)
+        # Acquire on a separate thread so the SDK's blocking waits (which
+        # release the GIL in their ctypes calls) do not block concurrent
+        # Python work in this thread, such as abort polling.
+        frame_queue = queue.Queue(maxsize=self._buffer_count)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._acquisition_producer,
+            args=(n_images, images, frame_queue, stop),
+            daemon=True,
+        )
+        producer.start()
+        acquired = 0
+        try:
+            while acquired < n_images:
+                if self._abort_event.is_set():
+                    logger.info('Abort during acquisition.')
+                    self._abort_event.clear()
+                    return
+                try:
+                    item = frame_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if isinstance(item, Exception):
+                    if self.exception_on_failed_shot:
+                        raise item
+                    logger.info('Acquisition failed; giving up: %s', item)
+                    return
+                # For a preallocated array the producer writes frames in
+                # place and the queue item is just a completion token.
+                if not isinstance(images, np.ndarray):
+                    images.append(item)
+                acquired += 1
+                logger.debug('Got image %d of %d.', acquired, n_images)
+        finally:
+            stop.set()
+            producer.join()
+        logger.info('Got %d of %d images.', acquired, n_images)
+        self.software = True
+
+    def _acquisition_producer(self, n_images, images, frame_queue, stop):
+        """Acquire n_images frames and feed copies into frame_queue.
+
+        Runs on a daemon thread started by :obj:`grab_multiple`. Software
+        triggers are pipelined: the trigger for frame i+1 is issued as soon
+        as frame i is retrieved, before the Python-side copy, so the
+        camera's next exposure overlaps frame handling. After too many
+        consecutive timeouts the FrameTimeout is put on the queue for the
+        consumer to handle.
+
+        Args:
+            n_images (int): Number of frames to acquire.
+            images (list or numpy.ndarray): When a preallocated array, each
+                frame is copied straight into images[i] (one contiguous
+                memcpy) and the queue carries the frame index; otherwise
+                copies go through the queue to be appended by the consumer.
+            frame_queue (queue.Queue): Receives copied frames or completion
+                tokens, or a FrameTimeout on permanent failure.
+            stop (threading.Event): Set by the consumer to end acquisition
+                early.
+        """
+        # Hoist the hot-loop invariants: the specialized wait closure built
+        # by _arm, the trigger method (None in hardware-triggered mode), and
+        # whether the output is preallocated.
+        fast_grab = self._fast_grab
+        trigger = self.camera.issue_software_trigger if self.software else None
+        preallocated = isinstance(images, np.ndarray)
+        if trigger is not None:
+            trigger()
+        fails = 0
+        acquired = 0
+        while acquired < n_images and not stop.is_set():
+            try:
+                frame = fast_grab()
+            except FrameTimeout as exc:
+                # fast_grab() already blocked for the full frame deadline,
+                # so no additional sleep is needed before retrying.
+                fails += 1
+                if fails > self.MAX_GRAB_FAILURES:
+                    frame_queue.put(exc)
+                    return
+                logger.debug('Frame wait timed out; retrying.')
+                if trigger is not None:
+                    # The previous trigger produced no frame; issue a fresh
+                    # one before waiting again.
+                    trigger()
+                continue
+            if trigger is not None and acquired < n_images - 1:
+                trigger()
+            # fast_grab() returns a view over a buffer the SDK recycles on
+            # the next poll, so copy before the next wait.
+            if preallocated:
+                np.copyto(images[acquired], frame)
+                frame_queue.put(acquired)
+            else:
+                frame_queue.put(np.copy(frame))
+            fails = 0
+            acquired += 1
+
+    def stop_acquisition(self):
+        """Tells camera to stop current acquistion."""
+        self.camera.disarm()
+        self.is_armed=False
+
+    # Kept as a property over a threading.Event so setting the flag from
+    # another thread has proper memory visibility and existing callers that
+    # assign the attribute directly keep working.
+    @property
+    def _abort_acquisition(self):
+        return self._abort_event.is_set()
+
+    @_abort_acquisition.setter
+    def _abort_acquisition(self, value):
+        if value:
+            self._abort_event.set()
+        else:
+            self._abort_event.clear()
+
+    def abort_acquisition(self):
+        """Sets the abort event to break the buffered acquisition loop."""
+        self._abort_event.set()
+
+    def close(self):
+        """Closes :obj:`camera` handle to the camera."""
+        self.camera.dispose()
+        self.thorsdk.dispose()
+
+
+class ThorCamWorker(IMAQdxCameraWorker):
+    """FlyCapture2 API Camera Worker. 
+    
+    Inherits from obj:`IMAQdxCameraWorker`. Defines :obj:`interface_class` and overloads
+    :obj:`get_attributes_as_dict` to use ThorCam.get_attributes() method."""
+    interface_class = Thorlab_Camera
+
+    def get_attributes_as_dict(self, visibility_level):
+        """Return a dict of the attributes of the camera for the given visibility
+        level
+        
+        Args:
+            visibility_level (str): Normally configures level of attribute detail
+                to return. Is not used by Thorlab_Camera.
+        """
+        if self.mock:
+            return IMAQdxCameraWorker.get_attributes_as_dict(self,visibility_level)
+        else:
+            return self.camera.get_attributes()
+
+